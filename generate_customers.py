@@ -1,26 +1,28 @@
-import csv
-import random
-from datetime import datetime, timedelta
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pv
+from datetime import datetime
+
+rng = np.random.default_rng()
 
 def generate_customers(num_customers=1000, output_file='customers_sample.csv'):
     """Generate sample customer data"""
-    
+
     tiers = ['bronze', 'silver', 'gold']
-    
-    with open(output_file, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(['customer_id', 'name', 'email', 'registration_date', 'customer_tier'])
-        
-        for i in range(1000, 1000 + num_customers):
-            reg_date = datetime.now() - timedelta(days=random.randint(1, 365))
-            writer.writerow([
-                f'CUST-{i}',
-                f'Customer {i}',
-                f'customer{i}@example.com',
-                reg_date.strftime('%Y-%m-%d'),
-                random.choice(tiers)
-            ])
-    
+
+    ids = np.arange(1000, 1000 + num_customers).astype(str)
+    days = rng.integers(1, 366, size=num_customers)
+    reg_dates = np.datetime64(datetime.now().date()) - days.astype('timedelta64[D]')
+
+    customers = pa.table({
+        'customer_id': np.char.add('CUST-', ids),
+        'name': np.char.add('Customer ', ids),
+        'email': np.char.add(np.char.add('customer', ids), '@example.com'),
+        'registration_date': reg_dates.astype('datetime64[D]'),
+        'customer_tier': rng.choice(tiers, size=num_customers),
+    })
+    pv.write_csv(customers, output_file)
+
     print(f'Generated {num_customers} customers in {output_file}')
 
 if __name__ == '__main__':
@@ -1,56 +1,110 @@
 # generate_orders.py
-import json
-import random
-from datetime import datetime, timedelta
-import uuid
+import os
+from datetime import datetime
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 
-def generate_orders(num_orders=50, output_file='orders_sample.json'):
+# Mirrors the staging_orders table so the Parquet file loads without a schema
+ORDER_SCHEMA = pa.schema([
+    pa.field('order_id', pa.string(), nullable=False),
+    pa.field('customer_id', pa.string(), nullable=False),
+    pa.field('order_timestamp', pa.timestamp('us', tz='UTC'), nullable=False),
+    pa.field('items', pa.list_(pa.struct([
+        ('product_id', pa.string()),
+        ('quantity', pa.int64()),
+        ('unit_price', pa.float64()),
+    ]))),
+    pa.field('total_amount', pa.float64(), nullable=False),
+    pa.field('payment_status', pa.string()),
+    pa.field('shipping_address', pa.struct([
+        ('street', pa.string()),
+        ('city', pa.string()),
+        ('state', pa.string()),
+        ('zipcode', pa.string()),
+        ('country', pa.string()),
+    ])),
+])
+
+rng = np.random.default_rng()
+
+# Positions of the 32 hex digits within a 36-character dashed UUID string
+UUID_HEX_POSITIONS = np.r_[0:8, 9:13, 14:18, 19:23, 24:36]
+
+def uuid4_strings(n):
+    """Generate n random UUID4 strings from a single os.urandom call"""
+    raw = np.frombuffer(os.urandom(16 * n), dtype=np.uint8).reshape(n, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    
+    hex_digits = np.frombuffer(raw.tobytes().hex().encode(), dtype=np.uint8).reshape(n, 32)
+    chars = np.full((n, 36), ord('-'), dtype=np.uint8)
+    chars[:, UUID_HEX_POSITIONS] = hex_digits
+    return pa.array(chars.view('S36').ravel()).cast(pa.string())
+
+def generate_orders(num_orders=50, output_file='orders_sample.parquet'):
     """Generate sample order data"""
     
     categories = ['Electronics', 'Clothing', 'Home & Garden', 'Books', 'Sports']
     statuses = ['completed', 'pending', 'failed']
-    cities = ['New York', 'Los Angeles', 'Chicago', 'Houston', 'Phoenix']
-    states = ['NY', 'CA', 'IL', 'TX', 'AZ']
-    
-    orders = []
-    
-    for _ in range(num_orders):
-        num_items = random.randint(1, 5)
-        items = []
-        total = 0
-        
-        for _ in range(num_items):
-            unit_price = round(random.uniform(10, 500), 2)
-            quantity = random.randint(1, 3)
-            items.append({
-                'product_id': f'PROD-{random.randint(1000, 9999)}',
-                'quantity': quantity,
-                'unit_price': unit_price
-            })
-            total += unit_price * quantity
-        
-        city_idx = random.randint(0, len(cities)-1)
-        
-        order = {
-            'order_id': str(uuid.uuid4()),
-            'customer_id': f'CUST-{random.randint(1000, 5000)}',
-            'order_timestamp': (datetime.now() - timedelta(minutes=random.randint(0, 60))).isoformat(),
-            'items': items,
-            'total_amount': round(total, 2),
-            'payment_status': random.choice(statuses),
-            'shipping_address': {
-                'street': f'{random.randint(100, 9999)} Main St',
-                'city': cities[city_idx],
-                'state': states[city_idx],
-                'zipcode': f'{random.randint(10000, 99999)}',
-                'country': 'USA'
-            }
-        }
-        orders.append(order)
-    
-    with open(output_file, "w") as f:
-        for row in orders:
-            f.write(json.dumps(row) + "\n")
+    locations = np.array(
+        [('New York', 'NY'), ('Los Angeles', 'CA'), ('Chicago', 'IL'), ('Houston', 'TX'), ('Phoenix', 'AZ')],
+        dtype=[('city', 'U16'), ('state', 'U2')],
+    )
+    
+    num_items = rng.integers(1, 6, size=num_orders)
+    customer_ids = rng.integers(1000, 5001, size=num_orders)
+    minutes_ago = rng.integers(0, 61, size=num_orders)
+    payment_statuses = rng.choice(statuses, size=num_orders)
+    street_numbers = rng.integers(100, 10000, size=num_orders)
+    picks = locations[rng.integers(0, len(locations), size=num_orders)]
+    zipcodes = rng.integers(10000, 100000, size=num_orders)
+    
+    now = np.datetime64(datetime.now(), 'us')
+    order_timestamps = now - minutes_ago.astype('timedelta64[m]')
+    
+    # Items for all orders live in flat arrays; order i owns offsets[i]:offsets[i+1]
+    offsets = np.concatenate(([0], np.cumsum(num_items)))
+    total_items = offsets[-1]
+    unit_prices = np.round(rng.uniform(10, 500, size=total_items), 2)
+    quantities = rng.integers(1, 4, size=total_items)
+    product_ids = rng.integers(1000, 10000, size=total_items)
+    totals = np.round(np.add.reduceat(unit_prices * quantities, offsets[:-1]), 2)
+    
+    item_type = ORDER_SCHEMA.field('items').type.value_type
+    items = pa.ListArray.from_arrays(
+        pa.array(offsets, type=pa.int32()),
+        pa.StructArray.from_arrays(
+            [np.char.add('PROD-', product_ids.astype(str)), quantities, unit_prices],
+            fields=list(item_type),
+        ),
+    )
+    
+    address_type = ORDER_SCHEMA.field('shipping_address').type
+    shipping_address = pa.StructArray.from_arrays(
+        [
+            np.char.add(street_numbers.astype(str), ' Main St'),
+            picks['city'],
+            picks['state'],
+            zipcodes.astype(str),
+            np.full(num_orders, 'USA'),
+        ],
+        fields=list(address_type),
+    )
+    
+    table = pa.Table.from_arrays(
+        [
+            uuid4_strings(num_orders),
+            np.char.add('CUST-', customer_ids.astype(str)),
+            pa.array(order_timestamps, type=ORDER_SCHEMA.field('order_timestamp').type),
+            items,
+            totals,
+            payment_statuses,
+            shipping_address,
+        ],
+        schema=ORDER_SCHEMA,
+    )
+    pq.write_table(table, output_file, compression='zstd', compression_level=3)
     
     print(f'Generated {num_orders} orders in {output_file}')
 
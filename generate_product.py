@@ -1,25 +1,26 @@
 # generate_products.py
-import csv
-import random
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pv
+
+rng = np.random.default_rng()
 
 def generate_products(num_products=100, output_file='products_sample.csv'):
     """Generate sample product catalog"""
     
     categories = ['Electronics', 'Clothing', 'Home & Garden', 'Books', 'Sports']
     
-    with open(output_file, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(['product_id', 'product_name', 'category', 'price', 'stock_level'])
-        
-        for i in range(1000, 1000 + num_products):
-            category = random.choice(categories)
-            writer.writerow([
-                f'PROD-{i}',
-                f'{category} Product {i}',
-                category,
-                round(random.uniform(10, 500), 2),
-                random.randint(0, 1000)
-            ])
+    ids = np.arange(1000, 1000 + num_products).astype(str)
+    cats = rng.choice(categories, size=num_products)
+    
+    products = pa.table({
+        'product_id': np.char.add('PROD-', ids),
+        'product_name': np.char.add(cats, np.char.add(' Product ', ids)),
+        'category': cats,
+        'price': np.round(rng.uniform(10, 500, size=num_products), 2),
+        'stock_level': rng.integers(0, 1001, size=num_products),
+    })
+    pv.write_csv(products, output_file)
     
     print(f'Generated {num_products} products in {output_file}')
 
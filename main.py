@@ -0,0 +1,18 @@
+# main.py
+from multiprocessing import Pool
+from generate_customers import generate_customers
+from generate_order import generate_orders
+from generate_product import generate_products
+
+def main():
+    """Generate all sample datasets in parallel, one process per generator"""
+
+    generators = [generate_customers, generate_products, generate_orders]
+
+    with Pool(len(generators)) as pool:
+        results = [pool.apply_async(generator) for generator in generators]
+        for result in results:
+            result.get()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+-- BigQuery table definitions for the ecommerce_data dataset.
+-- Run with: bq query --use_legacy_sql=false < sql/create_tables.sql
+--
+-- CREATE TABLE IF NOT EXISTS leaves existing tables untouched. To bring
+-- an existing dataset up to date, run sql/migrate_existing_tables.sql.
+-- Don't drop and recreate tables: that loses their history.
+
+-- Staging: raw orders as loaded from the landing Parquet files.
+-- Day partitions on order_timestamp let the 15-minute checks read only today.
+CREATE TABLE IF NOT EXISTS `ecommerce_data.staging_orders` (
+    order_id STRING NOT NULL,
+    customer_id STRING NOT NULL,
+    order_timestamp TIMESTAMP NOT NULL,
+    items ARRAY<STRUCT<product_id STRING, quantity INT64, unit_price FLOAT64>>,
+    total_amount FLOAT64 NOT NULL,
+    payment_status STRING,
+    shipping_address STRUCT<street STRING, city STRING, state STRING, zipcode STRING, country STRING>
+)
+PARTITION BY DATE(order_timestamp)
+CLUSTER BY order_id;
+
+-- Fact: one row per product per order.
+-- Partitioned on order_date so the MERGE in transform_to_fact_orders only
+-- probes today's partition on the target side. ingestion_time is filled
+-- by its default on insert and drives the incremental hourly aggregation.
+-- Clustering on order_id lets the MERGE skip blocks whose keys don't
+-- overlap the incoming batch.
+CREATE TABLE IF NOT EXISTS `ecommerce_data.fact_orders` (
+    order_id STRING NOT NULL,
+    customer_id STRING NOT NULL,
+    customer_tier STRING,
+    order_timestamp TIMESTAMP NOT NULL,
+    order_date DATE NOT NULL,
+    order_hour INT64,
+    product_id STRING,
+    product_name STRING,
+    category STRING,
+    quantity INT64,
+    unit_price FLOAT64,
+    line_total FLOAT64,
+    total_amount FLOAT64,
+    payment_status STRING,
+    city STRING,
+    state STRING,
+    country STRING,
+    region STRING,
+    ingestion_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP()
+)
+PARTITION BY order_date
+CLUSTER BY order_id, customer_id;
+
+-- Lookup: US state to sales region, joined in transform_to_fact_orders.
+-- States not listed here map to 'Other'. Re-run to apply edits.
+CREATE OR REPLACE TABLE `ecommerce_data.dim_states` AS
+SELECT state, region
+FROM UNNEST([
+    STRUCT('CA' AS state, 'West' AS region),
+    ('OR', 'West'),
+    ('WA', 'West'),
+    ('NY', 'East'),
+    ('NJ', 'East'),
+    ('PA', 'East'),
+    ('TX', 'South'),
+    ('AZ', 'South'),
+    ('NM', 'South')
+]);
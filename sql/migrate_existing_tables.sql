@@ -0,0 +1,33 @@
+-- One-off migration for a dataset created before sql/create_tables.sql.
+-- Run with: bq query --use_legacy_sql=false < sql/migrate_existing_tables.sql
+--
+-- Pause order_processing_incremental first and run this once. Each
+-- original table is kept under a *_unpartitioned name; drop it once the
+-- new layout is verified.
+
+-- fact_orders: ingestion_time drives update_hourly_aggregations.
+-- Historical rows keep a NULL ingestion_time; new inserts take the default.
+ALTER TABLE `ecommerce_data.fact_orders`
+    ADD COLUMN IF NOT EXISTS ingestion_time TIMESTAMP;
+
+-- fact_orders: copy into the partitioned/clustered layout and swap.
+CREATE TABLE `ecommerce_data.fact_orders_partitioned`
+PARTITION BY order_date
+CLUSTER BY order_id, customer_id
+AS SELECT * FROM `ecommerce_data.fact_orders`;
+
+ALTER TABLE `ecommerce_data.fact_orders` RENAME TO fact_orders_unpartitioned;
+ALTER TABLE `ecommerce_data.fact_orders_partitioned` RENAME TO fact_orders;
+
+-- CTAS doesn't carry column defaults, so set it on the swapped-in table
+ALTER TABLE `ecommerce_data.fact_orders`
+    ALTER COLUMN ingestion_time SET DEFAULT CURRENT_TIMESTAMP();
+
+-- staging_orders: copy into the partitioned/clustered layout and swap.
+CREATE TABLE `ecommerce_data.staging_orders_partitioned`
+PARTITION BY DATE(order_timestamp)
+CLUSTER BY order_id
+AS SELECT * FROM `ecommerce_data.staging_orders`;
+
+ALTER TABLE `ecommerce_data.staging_orders` RENAME TO staging_orders_unpartitioned;
+ALTER TABLE `ecommerce_data.staging_orders_partitioned` RENAME TO staging_orders;